@@ -0,0 +1,208 @@
+# Direct input injection for playback
+# Calls SendInput (Windows), XTest (Linux) or Quartz (macOS) without going through
+# pyautogui's per-call wrappers (failsafe checks, PAUSE, position queries).
+# Falls back to pyautogui when no native backend can be loaded.
+# Functions mirror pyautogui: moveTo(x, y), mouseDown(button), mouseUp(button),
+# keyDown(key), keyUp(key) with pyautogui key names.
+
+import sys
+import pyautogui
+
+BACKEND = "pyautogui"
+
+moveTo = pyautogui.moveTo
+keyDown = pyautogui.keyDown
+keyUp = pyautogui.keyUp
+
+
+def mouseDown(button='left'):
+    # pyautogui takes x, y first, so button has to go by keyword
+    pyautogui.mouseDown(button=button)
+
+
+def mouseUp(button='left'):
+    pyautogui.mouseUp(button=button)
+
+
+def _key_codes(mask=None):
+    # pyautogui key name -> native key code, from pyautogui's own platform table.
+    # 0 is a valid code on macOS (kVK_ANSI_A); negative is VkKeyScan's "no key" on Windows.
+    codes = {}
+    for name, code in pyautogui.platformModule.keyboardMapping.items():
+        if code is None or code < 0:
+            continue
+        codes[name] = code & mask if mask else code
+    return codes
+
+
+def _init_win32():
+    import ctypes
+    from ctypes import wintypes
+
+    class MOUSEINPUT(ctypes.Structure):
+        _fields_ = [('dx', wintypes.LONG), ('dy', wintypes.LONG), ('mouseData', wintypes.DWORD),
+                    ('dwFlags', wintypes.DWORD), ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+    class KEYBDINPUT(ctypes.Structure):
+        _fields_ = [('wVk', wintypes.WORD), ('wScan', wintypes.WORD), ('dwFlags', wintypes.DWORD),
+                    ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+    class INPUTUNION(ctypes.Union):
+        _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT)]
+
+    class INPUT(ctypes.Structure):
+        _fields_ = [('type', wintypes.DWORD), ('u', INPUTUNION)]
+
+    INPUT_MOUSE = 0
+    INPUT_KEYBOARD = 1
+    KEYEVENTF_KEYUP = 0x0002
+    button_flags = {
+        'left': (0x0002, 0x0004),
+        'right': (0x0008, 0x0010),
+        'middle': (0x0020, 0x0040),
+    }
+
+    user32 = ctypes.windll.user32
+    send_input = user32.SendInput
+    set_cursor_pos = user32.SetCursorPos
+
+    # One INPUT per event kind, mutated in place before each call
+    mouse_inp = INPUT(type=INPUT_MOUSE)
+    key_inp = INPUT(type=INPUT_KEYBOARD)
+    mouse_ref, mouse_size = ctypes.byref(mouse_inp), ctypes.sizeof(mouse_inp)
+    key_ref, key_size = ctypes.byref(key_inp), ctypes.sizeof(key_inp)
+    mi = mouse_inp.u.mi
+    ki = key_inp.u.ki
+
+    # VkKeyScan results carry shift state in the high byte; recordings replay
+    # modifier keys as separate events so only the VK code is kept
+    vk_map = _key_codes(0xFF)
+
+    def move_to(x, y):
+        # SetCursorPos takes pixel coordinates directly, SendInput would need
+        # normalizing to the 0..65535 absolute range
+        set_cursor_pos(x, y)
+
+    def mouse_down(button='left'):
+        mi.dwFlags = button_flags[button][0]
+        send_input(1, mouse_ref, mouse_size)
+
+    def mouse_up(button='left'):
+        mi.dwFlags = button_flags[button][1]
+        send_input(1, mouse_ref, mouse_size)
+
+    def key_down(key):
+        vk = vk_map.get(key)
+        if vk is None:
+            return
+        ki.wVk = vk
+        ki.dwFlags = 0
+        send_input(1, key_ref, key_size)
+
+    def key_up(key):
+        vk = vk_map.get(key)
+        if vk is None:
+            return
+        ki.wVk = vk
+        ki.dwFlags = KEYEVENTF_KEYUP
+        send_input(1, key_ref, key_size)
+
+    return "sendinput", move_to, mouse_down, mouse_up, key_down, key_up
+
+
+def _init_x11():
+    import os
+    from Xlib import X
+    from Xlib.display import Display
+    from Xlib.ext.xtest import fake_input
+
+    display = Display(os.environ['DISPLAY'])
+    sync = display.sync
+    buttons = {'left': 1, 'middle': 2, 'right': 3}
+    # pyautogui's X11 table uses keycode 0 for keys the keymap doesn't have
+    keycodes = {name: code for name, code in _key_codes().items() if code}
+
+    def move_to(x, y):
+        fake_input(display, X.MotionNotify, x=x, y=y)
+        sync()
+
+    def mouse_down(button='left'):
+        fake_input(display, X.ButtonPress, buttons[button])
+        sync()
+
+    def mouse_up(button='left'):
+        fake_input(display, X.ButtonRelease, buttons[button])
+        sync()
+
+    def key_down(key):
+        keycode = keycodes.get(key)
+        if keycode is None:
+            return
+        fake_input(display, X.KeyPress, keycode)
+        sync()
+
+    def key_up(key):
+        keycode = keycodes.get(key)
+        if keycode is None:
+            return
+        fake_input(display, X.KeyRelease, keycode)
+        sync()
+
+    return "xtest", move_to, mouse_down, mouse_up, key_down, key_up
+
+
+def _init_quartz():
+    import Quartz
+
+    post = Quartz.CGEventPost
+    tap = Quartz.kCGHIDEventTap
+    mouse_event = Quartz.CGEventCreateMouseEvent
+    key_event = Quartz.CGEventCreateKeyboardEvent
+    buttons = {
+        'left': (Quartz.kCGEventLeftMouseDown, Quartz.kCGEventLeftMouseUp, Quartz.kCGMouseButtonLeft),
+        'right': (Quartz.kCGEventRightMouseDown, Quartz.kCGEventRightMouseUp, Quartz.kCGMouseButtonRight),
+        'middle': (Quartz.kCGEventOtherMouseDown, Quartz.kCGEventOtherMouseUp, Quartz.kCGMouseButtonCenter),
+    }
+    keycodes = _key_codes()
+
+    def position():
+        return Quartz.CGEventGetLocation(Quartz.CGEventCreate(None))
+
+    def move_to(x, y):
+        post(tap, mouse_event(None, Quartz.kCGEventMouseMoved, (x, y), Quartz.kCGMouseButtonLeft))
+
+    def mouse_down(button='left'):
+        down, _, btn = buttons[button]
+        post(tap, mouse_event(None, down, position(), btn))
+
+    def mouse_up(button='left'):
+        _, up, btn = buttons[button]
+        post(tap, mouse_event(None, up, position(), btn))
+
+    def key_down(key):
+        keycode = keycodes.get(key)
+        if keycode is None:
+            return
+        post(tap, key_event(None, keycode, True))
+
+    def key_up(key):
+        keycode = keycodes.get(key)
+        if keycode is None:
+            return
+        post(tap, key_event(None, keycode, False))
+
+    return "quartz", move_to, mouse_down, mouse_up, key_down, key_up
+
+
+if sys.platform == 'win32':
+    _init = _init_win32
+elif sys.platform == 'darwin':
+    _init = _init_quartz
+else:
+    _init = _init_x11
+
+try:
+    BACKEND, moveTo, mouseDown, mouseUp, keyDown, keyUp = _init()
+except Exception:
+    # Missing native bindings (python-xlib, pyobjc) or no display: keep pyautogui
+    pass
@@ -4,18 +4,29 @@
 
 import threading
 import time
-import json
+import ctypes
 import os
 import sys
 from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room
 from pynput import keyboard, mouse
 import pyautogui
+import numpy as np
+import orjson
+import fastinput
 pyautogui.FAILSAFE = False
 pyautogui.PAUSE = 0
 import logging
+import heapq
+from collections import deque
+from enum import Enum
+from operator import itemgetter
 from threading import Lock
 
+if sys.platform == 'win32':
+    # Raise the system timer resolution so playback sleeps wake within ~1ms instead of ~15ms
+    ctypes.windll.winmm.timeBeginPeriod(1)
+
 APP_NAME = "KeyMouse Recorder Web"
 ICON_FILE = "icon.ico"
 
@@ -24,17 +35,75 @@ gui_logger.setLevel(logging.INFO)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
-socketio = SocketIO(app, async_mode='threading')
+# Threading mode on purpose: the pynput listeners need real OS threads for their hooks and
+# playback spin-waits, both of which would stall an eventlet/gevent hub once monkey-patched.
+# Stats payloads are well under 1KB, compressing them costs more than it saves.
+socketio = SocketIO(app, async_mode='threading', http_compression=False)
+
+# Event type codes stored in RecordingManager.type_code
+TYPE_MOVE = 0
+TYPE_CLICK = 1
+TYPE_KEY_PRESS = 2
+TYPE_KEY_RELEASE = 3
+
+TYPE_NAMES = ('mouse_move', 'mouse_click', 'key_press', 'key_release')
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+INITIAL_CAPACITY = 65536
+STATS_INTERVAL = 0.2  # seconds between stats_update emits
+DRAIN_INTERVAL = 0.05  # seconds between listener ring drains
+MOVE_INTERVAL_NS = 50_000_000  # record mouse moves at most every 50ms (~20fps)
+SPIN_NS = 2_000_000  # playback busy-waits the last 2ms before each event
+PLAYBACK_BUTTONS = ('left', 'right', 'middle')
+UI_ROOM = 'ui'  # Socket.IO room every browser client joins on connect
+
+# pynput special key string -> pyautogui key name
+_SPECIALS = {
+    'Key.space': 'space',
+    'Key.enter': 'return',
+    'Key.tab': 'tab',
+    'Key.backspace': 'backspace',
+    'Key.esc': 'esc',
+    'Key.shift': 'shift',
+    'Key.shift_l': 'shiftleft',
+    'Key.shift_r': 'shiftright',
+    'Key.ctrl': 'ctrl',
+    'Key.ctrl_l': 'ctrlleft',
+    'Key.ctrl_r': 'ctrlright',
+    'Key.alt': 'alt',
+    'Key.alt_l': 'altleft',
+    'Key.alt_r': 'altright',
+    'Key.cmd': 'win',
+    'Key.cmd_l': 'winleft',
+    'Key.cmd_r': 'winright',
+    'Key.f1': 'f1',
+    'Key.f2': 'f2',
+    'Key.f3': 'f3',
+    'Key.f4': 'f4',
+    'Key.f5': 'f5',
+    'Key.f6': 'f6',
+    'Key.f7': 'f7',
+    'Key.f8': 'f8',
+    'Key.f9': 'f9',
+    'Key.f10': 'f10',
+    'Key.f11': 'f11',
+    'Key.f12': 'f12',
+}
+_QUOTES = frozenset(("'", '"'))
 
 class RecordingManager:
     def __init__(self):
         # Recording state
         self.is_recording = False
-        self.events = []
-        self.start_time = 0
+        self.start_ns = 0
         self.record_type = "all"  # all, mouse, keyboard
+        self._record_mouse = True  # record_type filter, precomputed for the callbacks
+        self._record_keyboard = True
+        self.move_dedup_px = 2  # drop mouse moves closer than this (Manhattan) to the last recorded one
 
-        # Stats for recording
+        # Stats for recording. The listener callbacks never touch these: counters are
+        # written only under events_lock (by _drain, or when resetting/loading) and
+        # emit_stats reads them lock-free, tolerating a few events of skew.
         self.move_count = 0
         self.click_count = 0
         self.key_press_count = 0
@@ -60,148 +129,314 @@ class RecordingManager:
         # Threading
         self.events_lock = Lock()
 
+        # Event storage (struct of arrays, see _reset_events)
+        self._reset_events()
+
+        # Lock-free hand-off from the listener threads: each ring has one producer
+        # (its pynput listener) and one consumer (drain_loop)
+        self.mouse_ring = deque()
+        self.keyboard_ring = deque()
+
+        # id(Key/Button member) -> interned str(member), see run_listeners
+        self._key_cache = {}
+
         # Status
         self.status = "Ready"
-        self.last_event_info = "None"
+        # Last ring entry, formatted lazily by emit_stats. Callbacks replace it with a
+        # single attribute store, so the emitter can read it without a lock.
+        self.last_event = None
+
+        # Stats emitter
+        self.stats_interval = STATS_INTERVAL
+        self._last_stats = None
 
         # Start global keyboard listener
         self.start_global_listeners()
 
+        socketio.start_background_task(self.drain_loop)
+        socketio.start_background_task(self.stats_loop)
+
+    def _reset_events(self, cap=INITIAL_CAPACITY):
+        # Preallocated columns, only the first self.count rows are valid
+        self.cap = cap
+        self.count = 0
+        self.times = np.empty(cap, 'f8')
+        self.xs = np.empty(cap, 'i4')
+        self.ys = np.empty(cap, 'i4')
+        self.type_code = np.empty(cap, 'u1')
+        self.key_id = np.empty(cap, 'i4')  # interned button/key string, -1 if none
+        self.pressed = np.empty(cap, '?')
+
+        # Button/key strings are interned to int ids, key_names is the reverse table
+        self.key_intern = {}
+        self.key_names = []
+
+    def _grow(self):
+        self.cap *= 2
+        self.times = np.resize(self.times, self.cap)
+        self.xs = np.resize(self.xs, self.cap)
+        self.ys = np.resize(self.ys, self.cap)
+        self.type_code = np.resize(self.type_code, self.cap)
+        self.key_id = np.resize(self.key_id, self.cap)
+        self.pressed = np.resize(self.pressed, self.cap)
+
+    def _intern(self, name):
+        key_id = self.key_intern.get(name)
+        if key_id is None:
+            key_id = self.key_intern[name] = len(self.key_names)
+            self.key_names.append(name)
+        return key_id
+
+    def _append(self, t, code, x=0, y=0, key_id=-1, pressed=False):
+        c = self.count
+        if c == self.cap:
+            self._grow()
+        self.times[c] = t
+        self.xs[c] = x
+        self.ys[c] = y
+        self.type_code[c] = code
+        self.key_id[c] = key_id
+        self.pressed[c] = pressed
+        self.count = c + 1
+
+    def _drain(self):
+        # Move pending ring entries into the event columns, caller holds events_lock
+        batches = [[ring.popleft() for _ in range(len(ring))]
+                   for ring in (self.mouse_ring, self.keyboard_ring)]
+        counts = [0, 0, 0, 0]
+        for t, code, x, y, name, pressed in heapq.merge(*batches, key=itemgetter(0)):
+            key_id = self._intern(name) if name is not None else -1
+            self._append(t, code, x, y, key_id, pressed)
+            counts[code] += 1
+        self.move_count += counts[TYPE_MOVE]
+        self.click_count += counts[TYPE_CLICK]
+        self.key_press_count += counts[TYPE_KEY_PRESS]
+        self.key_release_count += counts[TYPE_KEY_RELEASE]
+
+    def drain_loop(self):
+        # Single consumer for both listener rings
+        while True:
+            if self.mouse_ring or self.keyboard_ring:
+                with self.events_lock:
+                    self._drain()
+            socketio.sleep(DRAIN_INTERVAL)
+
+    def _columns(self):
+        # Stored event columns, trimmed to the recorded count, keyed as in the file format.
+        # The array slices stay valid after the lock is released: appends only write past
+        # count, and reset/grow allocate new arrays.
+        n = self.count
+        return {
+            'times': self.times[:n],
+            'xs': self.xs[:n],
+            'ys': self.ys[:n],
+            'type_code': self.type_code[:n],
+            'key_id': self.key_id[:n],
+            'pressed': self.pressed[:n],
+            'key_names': list(self.key_names),
+        }
+
+    def _load_columns(self, data):
+        n = len(data['times'])
+        self._reset_events(max(INITIAL_CAPACITY, n))
+        self.times[:n] = data['times']
+        self.xs[:n] = data['xs']
+        self.ys[:n] = data['ys']
+        self.type_code[:n] = data['type_code']
+        self.key_id[:n] = data['key_id']
+        self.pressed[:n] = data['pressed']
+        self.key_names = list(data['key_names'])
+        self.key_intern = {name: key_id for key_id, name in enumerate(self.key_names)}
+        self.count = n
+
+    def _load_events(self, events):
+        # Recordings saved before the columnar format store a list of event dicts
+        self._reset_events(max(INITIAL_CAPACITY, len(events)))
+        for event in events:
+            code = TYPE_CODES[event['type']]
+            if code == TYPE_MOVE:
+                self._append(event['time'], code, event['x'], event['y'])
+            elif code == TYPE_CLICK:
+                self._append(event['time'], code, event['x'], event['y'],
+                             self._intern(event['button']), event['pressed'])
+            else:
+                self._append(event['time'], code, key_id=self._intern(event['key']))
+
     def start_global_listeners(self):
+        # Keyed by id() like the key name cache in run_listeners: Key members are never
+        # freed, and an id lookup skips hashing the per-event KeyCode objects
+        hotkeys = {
+            id(keyboard.Key.f1): self._on_f1,
+            id(keyboard.Key.f2): self._on_f2,
+            id(keyboard.Key.f3): self._on_f3,
+            id(keyboard.Key.f4): self._on_f4,
+        }
+
         def on_press(key):
-            if key == keyboard.Key.f1 and not self.is_recording:
-                socketio.start_background_task(self.start_recording)
-            elif key == keyboard.Key.f2 and self.is_recording:
-                socketio.start_background_task(self.stop_recording)
-            elif key == keyboard.Key.f3 and not self.is_playing:
-                socketio.start_background_task(self.start_playback)
-            elif key == keyboard.Key.f4 and self.is_playing:
-                self.abort_playback = True
-                socketio.start_background_task(self.stop_playback)
+            handler = hotkeys.get(id(key))
+            if handler is not None:
+                handler()
 
         self.abort_listener = keyboard.Listener(on_press=on_press)
         self.abort_listener.start()
 
-    def emit_stats(self):
-        # Emit current stats via Socket.IO
-        with self.events_lock:
-            total_events = len(self.events)
-            mouse_total = self.move_count + self.click_count
-            key_total = self.key_press_count + self.key_release_count
-
-            duration = 0
-            if self.is_recording:
-                duration = time.time() - self.recording_start_timestamp
-            else:
-                duration = self.total_duration
-
-            eps = total_events / duration if duration > 0 else 0
+    def _on_f1(self):
+        if not self.is_recording:
+            socketio.start_background_task(self.start_recording)
 
-            hours, rem = divmod(int(duration), 3600)
-            mins, secs = divmod(rem, 60)
-            duration_str = f"{hours:02d}:{mins:02d}:{secs:02d}"
+    def _on_f2(self):
+        if self.is_recording:
+            socketio.start_background_task(self.stop_recording)
 
-            progress = min(100, (mouse_total + key_total) // 10) if self.is_recording else 0
+    def _on_f3(self):
+        if not self.is_playing:
+            socketio.start_background_task(self.start_playback)
+
+    def _on_f4(self):
+        if self.is_playing:
+            self.abort_playback = True
+            socketio.start_background_task(self.stop_playback)
+
+    def emit_stats(self, force=False):
+        # Emit current stats via Socket.IO, skipped if nothing changed since the last emit.
+        # Counters are read without taking events_lock, see "Stats for recording" in __init__.
+        total_events = self.count
+        mouse_total = self.move_count + self.click_count
+        key_total = self.key_press_count + self.key_release_count
+        status = self.status
+        last_event = self.last_event
+        is_recording = self.is_recording
+        is_playing = self.is_playing
+
+        if is_recording:
+            duration = time.time() - self.recording_start_timestamp
+        else:
+            duration = self.total_duration
 
-            socketio.emit('stats_update', {
-                'status': self.status,
-                'total_events': total_events,
-                'mouse_events': mouse_total,
-                'key_events': key_total,
-                'duration': duration_str,
-                'eps': f"{eps:.1f}",
-                'progress': progress,
-                'last_event': self.last_event_info,
-                'is_recording': self.is_recording,
-                'is_playing': self.is_playing
-            })
+        snapshot = (status, total_events, mouse_total, key_total, int(duration),
+                    last_event, is_recording, is_playing)
+        if not force and snapshot == self._last_stats:
+            return
+        self._last_stats = snapshot
+
+        eps = total_events / duration if duration > 0 else 0
+        last_event_info = self._describe_event(last_event)
+
+        hours, rem = divmod(int(duration), 3600)
+        mins, secs = divmod(rem, 60)
+
+        progress = min(100, (mouse_total + key_total) // 10) if is_recording else 0
+
+        socketio.emit('stats_update', {
+            'status': status,
+            'total_events': total_events,
+            'mouse_events': mouse_total,
+            'key_events': key_total,
+            'duration': f"{hours:02d}:{mins:02d}:{secs:02d}",
+            'eps': f"{eps:.1f}",
+            'progress': progress,
+            'last_event': last_event_info,
+            'is_recording': is_recording,
+            'is_playing': is_playing
+        }, to=UI_ROOM)
+
+    def _describe_event(self, event):
+        if event is None:
+            return "None"
+        _, code, x, y, name, pressed = event
+        if code == TYPE_MOVE:
+            return f"Mouse move to ({x}, {y})"
+        if code == TYPE_CLICK:
+            button_name = name.replace('Button.', '')
+            action = 'press' if pressed else 'release'
+            return f"Mouse {button_name} {action}"
+        key_str = name.strip("'")
+        action = 'press' if code == TYPE_KEY_PRESS else 'release'
+        return f"Key {action}: {key_str}"
+
+    def stats_loop(self):
+        # Single persistent emitter for recording and playback stats
+        while True:
+            self.emit_stats()
+            socketio.sleep(self.stats_interval)
 
     def start_recording(self, record_type="all"):
         if self.is_recording:
             return
         self.record_type = record_type
+        self._record_mouse = record_type in ("all", "mouse")
+        self._record_keyboard = record_type in ("all", "keyboard")
         pyautogui.moveTo(0, 0)
 
         self.is_recording = True
         with self.events_lock:
-            self.events = []
-        self.start_time = time.time()
-        # Reset stats
-        self.move_count = 0
-        self.click_count = 0
-        self.key_press_count = 0
-        self.key_release_count = 0
-        self.recording_start_timestamp = self.start_time
+            # Fresh rings per recording: late events from a previous session's listeners
+            # still shutting down land in its old rings and are never drained
+            self.mouse_ring = deque()
+            self.keyboard_ring = deque()
+            self._reset_events()
+            # Reset stats
+            self.move_count = 0
+            self.click_count = 0
+            self.key_press_count = 0
+            self.key_release_count = 0
+        self.start_ns = time.monotonic_ns()
+        self.recording_start_timestamp = time.time()
         self.status = "Recording... Press F2 to stop"
 
         socketio.start_background_task(self.run_listeners)
 
-        # Periodic stats updates
-        def update_loop():
-            while self.is_recording:
-                self.emit_stats()
-                socketio.sleep(0.5)
-            self.emit_stats()
-
-        socketio.start_background_task(update_loop)
-
     def run_listeners(self):
-        last_move_time = 0
+        last_move_ns = 0
+        last_x = last_y = -(1 << 30)  # far off-screen so the first move is always recorded
+        mouse_ring = self.mouse_ring
+        keyboard_ring = self.keyboard_ring
+        key_cache = self._key_cache
+
+        def key_name(key):
+            # Key/Button enum members are never freed, so their id() is a safe cache key.
+            # KeyCode objects are created per event and are converted every time.
+            name = key_cache.get(id(key))
+            if name is None:
+                name = str(key)
+                if isinstance(key, Enum):
+                    name = key_cache[id(key)] = sys.intern(name)
+            return name
 
         def on_mouse_move(x, y):
-            nonlocal last_move_time
-            current_time = time.time() - self.start_time
-            if self.is_recording and self.record_type in ["all", "mouse"] and current_time - last_move_time > 0.05:  # Record only every ~20fps
-                with self.events_lock:
-                    self.events.append({
-                        'type': 'mouse_move',
-                        'x': x,
-                        'y': y,
-                        'time': current_time
-                    })
-                    self.move_count += 1
-                    self.last_event_info = f"Mouse move to ({x}, {y})"
-                last_move_time = current_time
+            nonlocal last_move_ns, last_x, last_y
+            if not self._record_mouse:
+                return
+            if abs(x - last_x) + abs(y - last_y) < self.move_dedup_px:
+                return
+            t = time.monotonic_ns()
+            if t - last_move_ns <= MOVE_INTERVAL_NS:
+                return
+            if self.is_recording:
+                event = ((t - self.start_ns) * 1e-9, TYPE_MOVE, x, y, None, False)
+                mouse_ring.append(event)
+                self.last_event = event
+                last_move_ns = t
+                last_x = x
+                last_y = y
 
         def on_mouse_click(x, y, button, pressed):
-            if self.is_recording and self.record_type in ["all", "mouse"]:
-                with self.events_lock:
-                    self.events.append({
-                        'type': 'mouse_click',
-                        'x': x,
-                        'y': y,
-                        'button': str(button),
-                        'pressed': pressed,
-                        'time': time.time() - self.start_time
-                    })
-                    self.click_count += 1
-                    button_name = str(button).replace('Button.', '')
-                    action = 'press' if pressed else 'release'
-                    self.last_event_info = f"Mouse {button_name} {action}"
+            if self._record_mouse and self.is_recording:
+                event = ((time.monotonic_ns() - self.start_ns) * 1e-9, TYPE_CLICK, x, y, key_name(button), pressed)
+                mouse_ring.append(event)
+                self.last_event = event
 
         def on_keyboard_press(key):
-            if self.is_recording and self.record_type in ["all", "keyboard"]:
-                with self.events_lock:
-                    self.events.append({
-                        'type': 'key_press',
-                        'key': str(key),
-                        'time': time.time() - self.start_time
-                    })
-                    self.key_press_count += 1
-                    key_str = str(key).strip("'")
-                    self.last_event_info = f"Key press: {key_str}"
+            if self._record_keyboard and self.is_recording:
+                event = ((time.monotonic_ns() - self.start_ns) * 1e-9, TYPE_KEY_PRESS, 0, 0, key_name(key), False)
+                keyboard_ring.append(event)
+                self.last_event = event
 
         def on_keyboard_release(key):
-            if self.is_recording and self.record_type in ["all", "keyboard"]:
-                with self.events_lock:
-                    self.events.append({
-                        'type': 'key_release',
-                        'key': str(key),
-                        'time': time.time() - self.start_time
-                    })
-                    self.key_release_count += 1
-                    key_str = str(key).strip("'")
-                    self.last_event_info = f"Key release: {key_str}"
+            if self._record_keyboard and self.is_recording:
+                event = ((time.monotonic_ns() - self.start_ns) * 1e-9, TYPE_KEY_RELEASE, 0, 0, key_name(key), False)
+                keyboard_ring.append(event)
+                self.last_event = event
 
         # Start listeners
         self.mouse_listener = mouse.Listener(
@@ -225,24 +460,47 @@ class RecordingManager:
             return
         self.total_duration = time.time() - self.recording_start_timestamp
         self.is_recording = False
-        self.status = f"Recording stopped. Events: {len(self.events)}"
+        self.status = "Stopping recording..."
+
+        # Unhooking can block for a while on Windows, don't hold up the caller
+        threading.Thread(target=self._teardown_listeners,
+                         args=(self.mouse_listener, self.keyboard_listener,
+                               self.mouse_ring, self.keyboard_ring),
+                         daemon=True).start()
+
+        self.emit_stats()
 
-        # Stop listeners
-        if self.mouse_listener:
-            self.mouse_listener.stop()
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
+    def _teardown_listeners(self, mouse_listener, keyboard_listener, mouse_ring, keyboard_ring):
+        for listener in (mouse_listener, keyboard_listener):
+            if listener:
+                listener.stop()
+                listener.join()
 
+        # The listeners are gone, so nothing can be queued after this drain
+        with self.events_lock:
+            if self.mouse_ring is not mouse_ring or self.keyboard_ring is not keyboard_ring:
+                return  # a new recording started meanwhile and discarded this one
+            self._drain()
+            self.status = f"Recording stopped. Events: {self.count}"
         self.emit_stats()
 
     def start_playback(self):
-        if not self.events or self.is_playing:
+        if not self.count or self.is_playing:
             return
 
         pyautogui.moveTo(0, 0)
-        # Make a copy of events for thread safety
+        # Snapshot of the events: rows below count are never rewritten (see _columns),
+        # so slicing views is enough and the lock is only held to read the references
         with self.events_lock:
-            self.events_copy = self.events.copy()
+            columns = self._columns()
+
+        self.op_times_ns, self.ops = self.compile_ops(
+            (columns['times'] * 1e9).astype('i8'), columns['xs'], columns['ys'],
+            columns['type_code'], columns['key_id'], columns['pressed'], columns['key_names'])
+        if not self.ops:
+            self.status = "Nothing to replay"
+            self.emit_stats()
+            return
 
         self.is_playing = True
         self.abort_playback = False
@@ -251,113 +509,84 @@ class RecordingManager:
         # Start playback thread
         socketio.start_background_task(self.run_playback)
 
-        def update_loop():
-            while self.is_playing:
-                self.emit_stats()
-                socketio.sleep(0.1)
-
-        socketio.start_background_task(update_loop)
+    def compile_ops(self, times_ns, xs, ys, type_code, key_id, pressed, key_names):
+        # Resolve every event to a (func, args) pair once, so the playback loop only
+        # waits and calls. Events that can't be replayed are dropped here.
+        # Returns the kept events' times (int64 ns array) and the op list.
+        buttons = [name.replace("Button.", "").lower() for name in key_names]
+        pya_keys = [self.key_to_pya(name) for name in key_names]
+
+        op_times = []
+        ops = []
+        for t, code, x, y, k, p in zip(times_ns.tolist(), type_code.tolist(), xs.tolist(),
+                                       ys.tolist(), key_id.tolist(), pressed.tolist()):
+            if code == TYPE_MOVE:
+                op_times.append(t)
+                ops.append((fastinput.moveTo, (x, y)))
+            elif code == TYPE_CLICK:
+                if buttons[k] not in PLAYBACK_BUTTONS:
+                    continue
+                op_times.append(t)
+                ops.append((fastinput.mouseDown if p else fastinput.mouseUp, (buttons[k],)))
+            elif code == TYPE_KEY_PRESS or code == TYPE_KEY_RELEASE:
+                if not pya_keys[k]:
+                    continue
+                func = fastinput.keyDown if code == TYPE_KEY_PRESS else fastinput.keyUp
+                op_times.append(t)
+                ops.append((func, (pya_keys[k],)))
+        return np.array(op_times, 'i8'), ops
 
     def run_playback(self):
-        # Disable failsafe to prevent interruptions from corner moves
-        original_failsafe = pyautogui.FAILSAFE
-        pyautogui.FAILSAFE = False
-
         speed = max(self.speed, 0.1)
+        ops = self.ops
+        # Event offsets scaled by speed once, shifted to absolute deadlines per loop
+        offsets_ns = (self.op_times_ns / speed).astype('i8')
+        # Locals for the timing loop; the input functions are already bound in ops
+        sleep = time.sleep
+        perf_counter_ns = time.perf_counter_ns
 
         current_loop = 0
-        start_time = time.time()
-
-        while not self.abort_playback:
-            for event in self.events_copy:
-                if self.abort_playback:
-                    break
-                # Wait for the time
-                event_time = start_time + (event['time'] / speed)
-                wait_time = event_time - time.time()
-                if wait_time > 0:
-                    time.sleep(wait_time)
-
-                try:
-                    if event['type'] == 'mouse_move':
-                        pyautogui.moveTo(event['x'], event['y'])
-                    else:
-                        if event['type'] == 'mouse_click':
-                            button = event['button'].replace("Button.", "").lower()
-                            if event['pressed']:
-                                pyautogui.mouseDown(button=button)
-                            else:
-                                pyautogui.mouseUp(button=button)
-                        elif event['type'] == 'key_press':
-                            key_str = self.key_to_pya(event['key'])
-                            if key_str:
-                                pyautogui.keyDown(key_str)
-                        elif event['type'] == 'key_release':
-                            key_str = self.key_to_pya(event['key'])
-                            if key_str:
-                                pyautogui.keyUp(key_str)
-                except pyautogui.FailSafeException:
-                    self.status = "FailSafe triggered, aborting playback"
-                    self.abort_playback = True
-                    break
-                except Exception as e:
-                    # Skip invalid events
-                    pass
+        start_ns = perf_counter_ns()
 
-            if self.loop_mode:
-                # Infinite loop, continue
-                pass
-            else:
-                current_loop += 1
-                if current_loop >= self.loop_count:
-                    break
-            start_time = time.time()
+        status = "Playback finished"
+        try:
+            while not self.abort_playback:
+                deadlines_ns = (offsets_ns + start_ns).tolist()
+                for deadline_ns, (func, args) in zip(deadlines_ns, ops):
+                    if self.abort_playback:
+                        break
+                    # Wait for the time: sleep most of it, then spin for precision
+                    remaining = deadline_ns - perf_counter_ns()
+                    if remaining > SPIN_NS:
+                        sleep((remaining - SPIN_NS) * 1e-9)
+                    while perf_counter_ns() < deadline_ns:
+                        pass
+
+                    func(*args)
+
+                if self.loop_mode:
+                    # Infinite loop, continue
+                    pass
+                else:
+                    current_loop += 1
+                    if current_loop >= self.loop_count:
+                        break
+                start_ns = perf_counter_ns()
+        except Exception as e:
+            status = f"Playback error: {str(e)}"
 
         # Finished playback
         self.is_playing = False
-        pyautogui.FAILSAFE = original_failsafe
 
-        self.status = "Playback finished"
+        self.status = status
         self.emit_stats()
 
-    def key_to_pya(self, key_str):
+    @staticmethod
+    def key_to_pya(key_str):
         # Convert pynput key string to pyautogui key
         if key_str.startswith("Key."):
-            specials = {
-                'Key.space': 'space',
-                'Key.enter': 'return',
-                'Key.tab': 'tab',
-                'Key.backspace': 'backspace',
-                'Key.esc': 'esc',
-                'Key.shift': 'shift',
-                'Key.shift_l': 'shiftleft',
-                'Key.shift_r': 'shiftright',
-                'Key.ctrl': 'ctrl',
-                'Key.ctrl_l': 'ctrlleft',
-                'Key.ctrl_r': 'ctrlright',
-                'Key.alt': 'alt',
-                'Key.alt_l': 'altleft',
-                'Key.alt_r': 'altright',
-                'Key.cmd': 'win',
-                'Key.cmd_l': 'winleft',
-                'Key.cmd_r': 'winright',
-                'Key.f1': 'f1',
-                'Key.f2': 'f2',
-                'Key.f3': 'f3',
-                'Key.f4': 'f4',
-                'Key.f5': 'f5',
-                'Key.f6': 'f6',
-                'Key.f7': 'f7',
-                'Key.f8': 'f8',
-                'Key.f9': 'f9',
-                'Key.f10': 'f10',
-                'Key.f11': 'f11',
-                'Key.f12': 'f12',
-            }
-            return specials.get(key_str)
-        elif key_str.startswith('\'') and key_str.endswith('\''):
-            return key_str[1:-1]
-        elif key_str.startswith('"') and key_str.endswith('"'):
+            return _SPECIALS.get(key_str)
+        elif len(key_str) >= 2 and key_str[0] in _QUOTES and key_str[-1] == key_str[0]:
             return key_str[1:-1]
         else:
             return key_str
@@ -373,53 +602,49 @@ class RecordingManager:
     def save_recording(self, filename="recording.json"):
         try:
             with self.events_lock:
-                if not self.events:
+                if not self.count:
                     return "No data to save"
 
                 data = {
-                    'events': self.events,
+                    **self._columns(),
                     'timestamp': time.time(),
                     'description': "Recorded macro",
                     'stats': {
-                        'total_events': len(self.events),
+                        'total_events': self.count,
                         'mouse_events': self.move_count + self.click_count,
                         'key_events': self.key_press_count + self.key_release_count,
                         'duration': self.total_duration
                     }
                 }
 
-                with open(filename, 'w') as f:
-                    json.dump(data, f, indent=2)
-                return f"Saved to {filename}"
+            # Serialize and write without holding events_lock
+            with open(filename, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
+            return f"Saved to {filename}"
         except Exception as e:
             return f"Error saving: {str(e)}"
 
     def load_recording(self, filename="recording.json"):
         try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
+            with open(filename, 'rb') as f:
+                data = orjson.loads(f.read())
             with self.events_lock:
-                self.events = data.get('events', [])
                 stats = data.get('stats', {})
-                self.move_count = 0
-                self.click_count = 0
-                self.key_press_count = 0
-                self.key_release_count = 0
+                if 'events' in data:
+                    self._load_events(data['events'])
+                else:
+                    self._load_columns(data)
                 # Recount stats
-                for event in self.events:
-                    if event['type'] == 'mouse_move':
-                        self.move_count += 1
-                    elif event['type'] == 'mouse_click':
-                        self.click_count += 1
-                    elif event['type'] == 'key_press':
-                        self.key_press_count += 1
-                    elif event['type'] == 'key_release':
-                        self.key_release_count += 1
+                counts = np.bincount(self.type_code[:self.count], minlength=len(TYPE_NAMES))
+                self.move_count = int(counts[TYPE_MOVE])
+                self.click_count = int(counts[TYPE_CLICK])
+                self.key_press_count = int(counts[TYPE_KEY_PRESS])
+                self.key_release_count = int(counts[TYPE_KEY_RELEASE])
 
                 self.total_duration = stats.get('duration', 0)
-                self.status = f"Loaded: {len(self.events)} events"
+                self.status = f"Loaded: {self.count} events"
                 self.emit_stats()
-                return f"Loaded: {len(self.events)} events"
+                return f"Loaded: {self.count} events"
         except Exception as e:
             return f"Error loading: {str(e)}"
 
@@ -430,6 +655,10 @@ manager = RecordingManager()
 def index():
     return render_template('index.html')
 
+@socketio.on('connect')
+def handle_connect():
+    join_room(UI_ROOM)
+
 @socketio.on('start_recording')
 def handle_start_recording(data):
     record_type = data.get('type', 'all')
@@ -464,7 +693,7 @@ def handle_load_recording(data):
 
 @socketio.on('get_stats')
 def handle_get_stats():
-    manager.emit_stats()
+    manager.emit_stats(force=True)
 
 if __name__ == "__main__":
     print("Starting KeyMouse Recorder Web App...")